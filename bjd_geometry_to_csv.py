@@ -10,6 +10,11 @@
 4. 'output/temp_...'로 시작하는 임시 CSV를 파일별로 생성합니다.
 5. 모든 임시 CSV를 하나로 병합하여 'output' 폴더에 최종 결과물(result.csv, error.csv)을 저장합니다.
 6. 임시 CSV 파일들을 삭제합니다.
+7. (선택, EXPORT_LOD=True) 1단계에서 읽은 법정동 경계를 레이어(리/읍면동)별로 병합한 뒤,
+   여러 단계의 단순화 파라미터(LOD)로 커버리지 단순화(원본이 유효한 커버리지이면 이웃 법정동과의
+   공유 경계 유지)하여 GeoParquet(WKB) 파일로 저장하고, 레이어별 커버리지 유효성과
+   단계별 꼭짓점 수/최대 하우스도르프 오차 리포트를 생성합니다.
+   (CSV 병합 성공 여부와 관계없이 실행)
 
 [오류 검증 로직 (후처리)]
 - (정상처리) 8자리 법정동코드(동)는 뒷자리에 00 패딩을 추가해 10자리로 자동 변환합니다.
@@ -18,6 +23,7 @@
 
 [필요 라이브러리]
 pip install geopandas pandas tqdm
+pip install "shapely>=2.1" pyarrow  # (선택) LOD 지오메트리 내보내기 사용 시 (GEOS 3.12 이상)
 
 [권장 디렉토리 구조]
 - (현재 디렉토리)/
@@ -29,15 +35,21 @@ pip install geopandas pandas tqdm
      |- (임시) temp_... .csv
      |- (최종) bjd_251117_2141_result.csv
      |- (최종) bjd_251117_2141_error.csv
+     |- (선택) bjd_251117_2141_lod1_t1.parquet ... (LOD 단계별)
+     |- (선택) bjd_251117_2141_lod_report.txt
 ================================================================================
 """
 import geopandas as gpd
 import pandas as pd
+import numpy as np
+import shapely
 import os
 import glob
 import re  # 정규표현식(Regex) 라이브러리
 from tqdm import tqdm  # 진행률 표시 라이브러리
 from datetime import datetime  # 파일명 생성을 위한 시간 라이브러리
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor  # LOD 단계별 병렬 처리
 
 # ===========================================================
 # [설정 영역]
@@ -57,6 +69,14 @@ NAME_CANDIDATES = ['RI_NM', 'EMD_NM']
 SE_CANDIDATES = ['COL_ADM_SE']
 SGG_CANDIDATES = ['SGG_OID']
 
+# 4. LOD(단순화) 지오메트리 내보내기 설정
+EXPORT_LOD = False                   # True일 때만 LOD 지오메트리를 내보냄
+# 단계별 단순화 파라미터 (EPSG:5179 기준). coverage_simplify는 Visvalingam-Whyatt 방식이므로
+# 이 값은 최대 오차(m)가 아니라 제거되는 삼각형 면적의 제곱근 수준입니다.
+# 실제 오차는 LOD 리포트의 '최대 하우스도르프 오차(m)'를 확인하세요.
+LOD_TOLERANCES = [1, 10, 50, 200]
+LOD_WORKERS = 1                      # LOD 단계별 병렬 처리 프로세스 수 (1이면 순차 처리)
+
 # ===========================================================
 # [데이터 소스]
 # 브이월드 공간정보 다운로드 # https://www.vworld.kr/dtmk/dtmk_ntads_s001.do
@@ -165,6 +185,153 @@ def post_process_and_save(final_df, output_dir, final_filename, error_filename):
         print("[정보] 오류 데이터가 발견되지 않았습니다.")
 
 
+def to_bjd_polygons(gdf, file_name):
+    """
+    쉐이프파일에서 읽은 GeoDataFrame(gdf)을 'legal_dong_code', 'legal_dong_tip', 'layer', 'filename'
+    컬럼과 EPSG:5179(미터) 지오메트리만 남긴 GeoDataFrame으로 변환합니다.
+    (격자 조회 테이블 등 폴리곤이 필요한 후속 작업용)
+
+    - 'layer'는 원본 레이어 구분입니다. ('RI': 행정구역_리, 'UMD': 행정구역_읍면동)
+      두 레이어는 중첩 관계(읍/면 폴리곤이 소속 리 폴리곤을 모두 덮음)이므로
+      함께 사용할 때는 레이어를 구분해야 합니다.
+
+    - 코드 정제는 post_process_and_save()와 같은 규칙을 따릅니다.
+      (8자리 코드는 '00' 패딩, 형식 오류/한글 미포함/빈 지오메트리 행은 제외)
+    - 필수 컬럼(코드/명칭)이 없으면 None을 반환합니다.
+    """
+    code_col = find_column(gdf.columns, CODE_CANDIDATES)
+    name_col = find_column(gdf.columns, NAME_CANDIDATES)
+    if not code_col or not name_col:
+        return None
+
+    codes = gdf[code_col].astype(str).str.strip()
+    tips = gdf[name_col].astype(str).str.strip()
+
+    # post_process_and_save()의 검증 규칙을 벡터 연산으로 적용
+    is_valid = (
+        codes.str.fullmatch(r'\d{8}|\d{10}')
+        & tips.str.contains(r'[ㄱ-ㅎㅏ-ㅣ가-힣]')
+        & gdf.geometry.notna()
+        & ~gdf.geometry.is_empty
+    )
+    codes = codes.where(codes.str.len() == 10, codes + '00')
+
+    result = gpd.GeoDataFrame({
+        'legal_dong_code': codes,
+        'legal_dong_tip': tips,
+        'layer': 'RI' if code_col == 'RI_CD' else 'UMD',
+        'filename': file_name,
+    }, geometry=gdf.geometry, crs=gdf.crs)
+
+    return result[is_valid].to_crs(epsg=5179).reset_index(drop=True)
+
+
+def load_bjd_polygons(file_path):
+    """
+    쉐이프파일 1개를 읽어 to_bjd_polygons()로 변환한 결과를 반환합니다.
+    """
+    gdf = gpd.read_file(file_path, encoding=SHP_ENCODING)
+    return to_bjd_polygons(gdf, os.path.basename(file_path))
+
+
+def simplify_lod_level(geoms, layers, tolerance):
+    """
+    [LOD] 병합된 법정동 경계(geoms)를 단순화 파라미터(tolerance) 1단계로 단순화합니다.
+    (ProcessPoolExecutor에서 단계별로 호출됩니다)
+
+    - shapely.coverage_simplify()로 레이어('RI'/'UMD')별 전체 커버리지를 한 번에 단순화합니다.
+      원본이 유효한 커버리지(겹침/틈 없이 경계가 일치)이면 이웃 법정동 사이(파일 경계 포함)의
+      공유 경계가 동일하게 단순화되어 틈/겹침이 생기지 않습니다. 원본의 겹침/틈은 그대로 남습니다.
+    - 반환값: (단순화된 지오메트리 배열, 꼭짓점 수, 최대 하우스도르프 오차(m))
+    """
+    simplified = np.empty(len(geoms), dtype=object)
+    for layer in np.unique(layers):
+        mask = layers == layer
+        simplified[mask] = shapely.coverage_simplify(geoms[mask], tolerance)
+
+    vertices = int(shapely.get_num_coordinates(simplified).sum())
+    hausdorff = shapely.hausdorff_distance(geoms, simplified)
+    max_hausdorff = float(np.nanmax(hausdorff)) if len(hausdorff) else 0.0
+
+    return simplified, vertices, max_hausdorff
+
+
+def export_lod_geometry(polygon_list, output_dir, timestamp):
+    """
+    [LOD] 1단계에서 읽은 법정동 경계(polygon_list)를 병합하여 단계별로 커버리지 단순화하고,
+    단계마다 하나의 GeoParquet(WKB, EPSG:4326) 파일과 꼭짓점 수/최대 하우스도르프 오차 리포트를 저장합니다.
+    """
+    print(f"\n[5단계] LOD 지오메트리 내보내기 시작... (단순화 파라미터: {LOD_TOLERANCES})")
+
+    # --- 0. 선택 의존성 확인 ---
+    if not hasattr(shapely, 'coverage_simplify') or shapely.geos_version < (3, 12, 0):
+        print("[경고] LOD 내보내기에는 shapely 2.1 이상(GEOS 3.12 이상)이 필요합니다. 건너뜁니다.")
+        return
+    try:
+        import pyarrow  # noqa: F401 (GeoParquet 저장용)
+    except ImportError:
+        print("[경고] LOD 내보내기에는 pyarrow가 필요합니다(pip install pyarrow). 건너뜁니다.")
+        return
+
+    if not polygon_list:
+        print("LOD 처리할 폴리곤이 없어 내보내기를 건너뜁니다.")
+        return
+
+    polygons = pd.concat(polygon_list, ignore_index=True)
+    geoms = polygons.geometry.to_numpy()
+    layers = polygons['layer'].to_numpy()
+
+    # --- 1. 레이어별 커버리지 유효성 검사 (겹침/틈이 있으면 단순화 후에도 그대로 남음) ---
+    coverage_lines = []
+    for layer in np.unique(layers):
+        layer_geoms = geoms[layers == layer]
+        if shapely.coverage_is_valid(layer_geoms):
+            coverage_lines.append(f"{layer} 레이어 커버리지: 유효")
+        else:
+            invalid_edges = shapely.coverage_invalid_edges(layer_geoms)
+            n_invalid = int((~shapely.is_empty(invalid_edges)).sum())
+            coverage_lines.append(
+                f"{layer} 레이어 커버리지: 무효 (불일치 경계를 가진 폴리곤 {n_invalid}개, "
+                f"해당 경계의 겹침/틈은 단순화 후에도 남음)"
+            )
+            print(f"[경고] {layer} 레이어의 원본 경계가 유효한 커버리지가 아닙니다. "
+                  f"(불일치 경계를 가진 폴리곤 {n_invalid}개)")
+
+    # --- 2. 단계별 단순화 (병렬 처리는 단계 단위) ---
+    if LOD_WORKERS > 1:
+        with ProcessPoolExecutor(max_workers=LOD_WORKERS) as executor:
+            results = list(tqdm(
+                executor.map(simplify_lod_level, repeat(geoms), repeat(layers), LOD_TOLERANCES),
+                total=len(LOD_TOLERANCES), desc="LOD 단순화"
+            ))
+    else:
+        results = [simplify_lod_level(geoms, layers, t) for t in tqdm(LOD_TOLERANCES, desc="LOD 단순화")]
+
+    # --- 3. 단계별 저장 ---
+    for level, (tolerance, (simplified, _, _)) in enumerate(zip(LOD_TOLERANCES, results), start=1):
+        level_gdf = polygons.set_geometry(gpd.GeoSeries(simplified, index=polygons.index, crs=polygons.crs))
+        lod_filename = f"bjd_{timestamp}_lod{level}_t{tolerance}.parquet"
+        level_gdf.to_crs(epsg=4326).to_parquet(os.path.join(output_dir, lod_filename), index=False)
+        print(f"[성공] LOD{level}(t={tolerance}) {len(level_gdf)}건을 '{lod_filename}'에 저장했습니다.")
+
+    # --- 4. 리포트 저장 ---
+    vertices_original = int(shapely.get_num_coordinates(geoms).sum())
+
+    report_lines = [f"총 {len(polygons)}건 법정동, 원본 꼭짓점 {vertices_original}개"] + coverage_lines
+    for level, (tolerance, (_, vertices, max_hausdorff)) in enumerate(zip(LOD_TOLERANCES, results), start=1):
+        ratio = vertices / vertices_original * 100 if vertices_original else 0.0
+        report_lines.append(
+            f"LOD{level} (단순화 파라미터 {tolerance}): 꼭짓점 {vertices}개 (원본 대비 {ratio:.2f}%), "
+            f"최대 하우스도르프 오차 {max_hausdorff:.2f}m"
+        )
+    report_text = "\n".join(report_lines)
+
+    report_path = os.path.join(output_dir, f"bjd_{timestamp}_lod_report.txt")
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write(report_text)
+    print(f"[정보] LOD 리포트를 '{os.path.basename(report_path)}'에 저장했습니다.\n{report_text}")
+
+
 def process_shapefiles():
     """
     메인 실행 함수. input 폴더의 shp 파일을 읽어 처리하고 output에 저장합니다.
@@ -190,6 +357,7 @@ def process_shapefiles():
     print("==================================================")
     
     generated_csvs = []  # 개별 생성된 임시 CSV 경로 리스트
+    lod_polygons = []    # (선택) LOD 내보내기용 EPSG:5179 폴리곤 리스트
 
     # ==================================================
     # [1단계] 개별 쉐이프파일 처리 및 임시 CSV 생성
@@ -217,6 +385,10 @@ def process_shapefiles():
             # 3. 지오메트리 연산
             # (1) 좌표계 변환 (EPSG:5179 - 미터 단위)
             gdf_5179 = gdf.to_crs(epsg=5179)
+
+            # (선택) LOD 내보내기용 폴리곤 보관 (파일을 다시 읽지 않도록 변환 결과 재사용)
+            if EXPORT_LOD:
+                lod_polygons.append(to_bjd_polygons(gdf_5179, file_name))
             
             # (2) 외접원(Minimum Bounding Circle) 반지름 (radius_km) 계산
             # minimum_bounding_circle()은 외접원을 폴리곤 형태로 반환합니다.
@@ -280,6 +452,15 @@ def process_shapefiles():
     else:
         print("처리된 CSV 파일이 없어 병합을 건너뜁니다.")
 
+    # ==================================================
+    # [5단계] (선택) LOD 지오메트리 내보내기 (CSV 병합과 독립)
+    # ==================================================
+    if EXPORT_LOD:
+        try:
+            export_lod_geometry(lod_polygons, OUTPUT_DIR, TIMESTAMP)
+        except Exception as e:
+            print(f"\n[오류!!] LOD 지오메트리 내보내기 중 예외 발생: {e}")
+
 
 if __name__ == "__main__":
     process_shapefiles()
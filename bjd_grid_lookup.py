@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+ 법정동 격자 조회 테이블(Grid Lookup Table) 생성 및 역지오코딩 조회 스크립트
+================================================================================
+[기능]
+1. 'input' 폴더 내의 모든 .shp 파일을 bjd_geometry_to_csv.py와 같은 방식으로 읽어옵니다.
+   (코드 표준화/오류 행 제외 규칙 동일, 좌표계는 EPSG:5179 미터 단위)
+2. 가장 세분화된 레이어만 남깁니다. 읍/면 폴리곤은 소속 리 폴리곤을 모두 덮으므로,
+   리(RI) 전체 + 하위 리가 없는 읍면동(UMD, 주로 도시의 '동')만 격자에 기록합니다.
+3. 전체 영역을 GRID_CELL_SIZE_M 크기의 정사각형 격자로 나누고, 각 셀과 내부가 겹치는
+   법정동을 STRtree 공간 인덱스로 한 번에(벡터 연산) 구합니다.
+   (셀 변/꼭짓점에 닿기만 하는 법정동은 제외)
+4. 셀마다 결과를 하나의 int32 값으로 기록합니다.
+   - 0       : 어떤 법정동과도 겹치지 않음 (바다, 국외 등)
+   - 양수 k  : 단일 법정동 셀. codes.npy[k - 1]이 법정동코드입니다.
+   - 음수 -k : 경계 셀(2개 이상 법정동과 겹침). 경계 테이블의 k - 1번 항목입니다.
+5. 결과물을 'output/bjd_{타임스탬프}_grid{셀크기}m/' 폴더에 저장합니다.
+   - grid.npy              : (행, 열) int32 격자. np.load(mmap_mode='r')로 메모리 매핑 가능
+   - codes.npy             : 법정동코드 테이블 (int64, 10자리)
+   - boundary_offsets.npy  : 경계 셀 후보 목록의 시작 위치 (CSR 방식, 길이 = 경계 셀 수 + 1)
+   - boundary_codes.npy    : 경계 셀 후보 법정동코드 (int64)
+   - meta.json             : 격자 원점, 셀 크기, 행/열 수 등
+   - report.txt            : 커버리지 및 경계 셀 통계
+6. query_grid()로 위/경도 배열을 한 번에 법정동코드로 변환할 수 있습니다.
+
+[주의]
+- 셀과 '겹치는' 법정동을 기준으로 하므로, 해안선에 걸친 셀은 바다 쪽 좌표도
+  해당 법정동코드를 반환합니다. 정확한 판정이 필요하면 경계 셀만 폴리곤으로 재검증하세요.
+
+[사용 예시]
+    from bjd_grid_lookup import load_grid, query_grid, get_boundary_candidates
+
+    grid = load_grid('output/bjd_251201_1200_grid250m')
+    codes, boundary_ids = query_grid(grid, lons, lats)
+    # codes: 법정동코드(int64), 0 = 미포함, -1 = 경계 셀
+    # 경계 셀 후보: get_boundary_candidates(grid, boundary_ids[i])
+
+[필요 라이브러리]
+pip install geopandas pandas tqdm
+================================================================================
+"""
+import geopandas as gpd
+import pandas as pd
+import numpy as np
+import shapely
+import os
+import glob
+import json
+import time
+from pyproj import Transformer
+from tqdm import tqdm  # 진행률 표시 라이브러리
+from datetime import datetime  # 파일명 생성을 위한 시간 라이브러리
+
+from bjd_geometry_to_csv import INPUT_DIR, OUTPUT_DIR, load_bjd_polygons
+
+# ===========================================================
+# [설정 영역]
+# ===========================================================
+
+# 1. 격자 셀 크기 (미터, EPSG:5179 기준). 예: 250, 1000
+GRID_CELL_SIZE_M = 250
+
+# 2. 한 번에 처리할 격자 행 수 (메모리 사용량 조절용)
+GRID_CHUNK_ROWS = 64
+
+# ===========================================================
+
+
+def select_finest_layer(gdf):
+    """
+    리(RI) 폴리곤 전체와, 하위 리가 없는 읍면동(UMD) 폴리곤만 남깁니다.
+    (읍면동 코드 'XXXXXXXX00'의 앞 8자리로 시작하는 리 코드가 있으면 하위 리가 있는 것으로 판단)
+    """
+    is_ri = gdf['layer'] == 'RI'
+    ri_prefixes = set(gdf.loc[is_ri, 'legal_dong_code'].str[:8])
+    has_ri_children = ~is_ri & gdf['legal_dong_code'].str[:8].isin(ri_prefixes)
+
+    return gdf[~has_ri_children].reset_index(drop=True)
+
+
+def build_grid(gdf, cell_size, output_path):
+    """
+    EPSG:5179 법정동 폴리곤(gdf)을 격자로 래스터화하여 output_path 폴더에 저장하고,
+    리포트용 통계(dict)를 반환합니다.
+    """
+    # --- 1. 법정동코드 테이블 (같은 코드의 여러 폴리곤은 하나로 취급) ---
+    codes, feature_code_idx = np.unique(
+        gdf['legal_dong_code'].astype(np.int64).to_numpy(), return_inverse=True
+    )
+    n_codes = len(codes)
+
+    # --- 2. 격자 범위 (셀 크기 단위로 정렬) ---
+    x_min, y_min, x_max, y_max = gdf.total_bounds
+    x_min = np.floor(x_min / cell_size) * cell_size
+    y_min = np.floor(y_min / cell_size) * cell_size
+    n_cols = int(np.ceil((x_max - x_min) / cell_size))
+    n_rows = int(np.ceil((y_max - y_min) / cell_size))
+
+    # grid.npy는 디스크에 직접 기록 (행 0 = 남쪽)
+    grid = np.lib.format.open_memmap(
+        os.path.join(output_path, 'grid.npy'), mode='w+', dtype=np.int32, shape=(n_rows, n_cols)
+    )
+
+    geoms = gdf.geometry.to_numpy()
+    shapely.prepare(geoms)  # 셀-폴리곤 술어(touches) 계산 가속
+    tree = shapely.STRtree(geoms)
+    col_x = x_min + np.arange(n_cols) * cell_size
+
+    boundary_offsets = [0]
+    boundary_codes = []
+    n_boundary = 0
+    max_candidates = 0
+    n_contained_not_single = 0  # 법정동 1개에 완전히 포함되었는데 단일 코드가 아닌 셀 (0이어야 정상)
+
+    # --- 3. 행 단위 청크로 셀-법정동 교차 쌍 계산 ---
+    for row_start in tqdm(range(0, n_rows, GRID_CHUNK_ROWS), desc="격자 생성"):
+        row_end = min(row_start + GRID_CHUNK_ROWS, n_rows)
+        xs, ys = np.meshgrid(col_x, y_min + np.arange(row_start, row_end) * cell_size)
+        xs, ys = xs.ravel(), ys.ravel()
+        cells = shapely.box(xs, ys, xs + cell_size, ys + cell_size)
+
+        cell_idx, feature_idx = tree.query(cells, predicate='intersects')
+
+        # 변/꼭짓점에서 닿기만 하는 쌍 제외 (내부가 겹치는 경우만 후보)
+        overlaps = ~shapely.touches(geoms[feature_idx], cells[cell_idx])
+        cell_idx, feature_idx = cell_idx[overlaps], feature_idx[overlaps]
+
+        # (셀, 법정동코드) 쌍을 중복 없이 정렬 -> 셀 순서, 코드 순서
+        pair_keys = np.unique(cell_idx.astype(np.int64) * n_codes + feature_code_idx[feature_idx])
+        pair_cells = pair_keys // n_codes
+        pair_codes = pair_keys % n_codes
+
+        uniq_cells, first, counts = np.unique(pair_cells, return_index=True, return_counts=True)
+
+        values = np.zeros(len(cells), dtype=np.int32)
+
+        # (1) 단일 법정동 셀
+        single = counts == 1
+        values[uniq_cells[single]] = pair_codes[first[single]] + 1
+
+        # (2) 경계 셀: 후보 목록을 CSR 형태로 이어붙임
+        multi = ~single
+        if multi.any():
+            multi_cells = uniq_cells[multi]
+            multi_counts = counts[multi]
+            values[multi_cells] = -(n_boundary + np.arange(1, len(multi_cells) + 1))
+
+            boundary_codes.append(codes[pair_codes[np.isin(pair_cells, multi_cells)]])
+            boundary_offsets.extend((boundary_offsets[-1] + np.cumsum(multi_counts)).tolist())
+            n_boundary += len(multi_cells)
+            max_candidates = max(max_candidates, int(multi_counts.max()))
+
+        # (3) 검증: 법정동 폴리곤 안에 완전히 들어가는 셀은 반드시 단일 코드여야 함
+        contained_cells, _ = tree.query(cells, predicate='within')
+        n_contained_not_single += int((values[np.unique(contained_cells)] <= 0).sum())
+
+        grid[row_start:row_end] = values.reshape(row_end - row_start, n_cols)
+
+    # --- 4. 부가 테이블 및 메타데이터 저장 ---
+    boundary_codes = np.concatenate(boundary_codes) if boundary_codes else np.empty(0, dtype=np.int64)
+    np.save(os.path.join(output_path, 'codes.npy'), codes)
+    np.save(os.path.join(output_path, 'boundary_offsets.npy'), np.asarray(boundary_offsets, dtype=np.int64))
+    np.save(os.path.join(output_path, 'boundary_codes.npy'), boundary_codes)
+
+    meta = {
+        'crs': 'EPSG:5179',
+        'cell_size_m': cell_size,
+        'x_min': float(x_min),
+        'y_min': float(y_min),
+        'n_rows': n_rows,
+        'n_cols': n_cols,
+        'n_codes': n_codes,
+        'n_boundary_cells': n_boundary,
+    }
+    with open(os.path.join(output_path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    # --- 5. 통계 집계 ---
+    n_single = int((grid > 0).sum())
+    # 단일 셀을 하나도 갖지 못한 법정동 (셀보다 작은 법정동 등, 경계 목록으로만 조회 가능)
+    n_codes_single = len(np.unique(grid[grid > 0]))
+    grid.flush()
+
+    return {
+        'n_cells': n_rows * n_cols,
+        'n_single': n_single,
+        'n_boundary': n_boundary,
+        'n_empty': n_rows * n_cols - n_single - n_boundary,
+        'n_codes': n_codes,
+        'n_codes_boundary_only': n_codes - n_codes_single,
+        'max_candidates': max_candidates,
+        'mean_candidates': len(boundary_codes) / n_boundary if n_boundary else 0.0,
+        'n_contained_not_single': n_contained_not_single,
+    }
+
+
+def load_grid(grid_dir):
+    """
+    build_grid()로 저장한 격자 조회 테이블을 불러옵니다.
+    grid.npy는 메모리 매핑(mmap_mode='r')으로 열리므로 전체를 메모리에 올리지 않습니다.
+    """
+    with open(os.path.join(grid_dir, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+
+    return {
+        'meta': meta,
+        'grid': np.load(os.path.join(grid_dir, 'grid.npy'), mmap_mode='r'),
+        'codes': np.load(os.path.join(grid_dir, 'codes.npy')),
+        'boundary_offsets': np.load(os.path.join(grid_dir, 'boundary_offsets.npy')),
+        'boundary_codes': np.load(os.path.join(grid_dir, 'boundary_codes.npy')),
+        'transformer': Transformer.from_crs('EPSG:4326', meta['crs'], always_xy=True),
+    }
+
+
+def query_grid(grid, lons, lats):
+    """
+    위/경도(EPSG:4326) 배열을 격자 조회 테이블로 한 번에 법정동코드로 변환합니다.
+    (좌표 1개를 스칼라로 넘겨도 되며, 이 경우 길이 1의 배열을 반환합니다)
+
+    반환값: (codes, boundary_ids)
+    - codes        : 법정동코드(int64). 0 = 미포함/격자 밖, -1 = 경계 셀
+    - boundary_ids : 경계 셀이면 경계 테이블 번호, 아니면 -1
+                     (get_boundary_candidates()로 후보 목록 조회)
+    """
+    meta = grid['meta']
+    lons = np.atleast_1d(np.asarray(lons, dtype=float))
+    lats = np.atleast_1d(np.asarray(lats, dtype=float))
+    x, y = grid['transformer'].transform(lons, lats)
+
+    cols = np.floor((np.asarray(x) - meta['x_min']) / meta['cell_size_m'])
+    rows = np.floor((np.asarray(y) - meta['y_min']) / meta['cell_size_m'])
+    inside = (cols >= 0) & (cols < meta['n_cols']) & (rows >= 0) & (rows < meta['n_rows'])
+
+    values = np.zeros(len(cols), dtype=np.int32)
+    values[inside] = grid['grid'][rows[inside].astype(np.intp), cols[inside].astype(np.intp)]
+
+    codes = np.zeros(len(values), dtype=np.int64)
+    single = values > 0
+    codes[single] = grid['codes'][values[single] - 1]
+    codes[values < 0] = -1
+
+    boundary_ids = np.where(values < 0, -values.astype(np.int64) - 1, -1)
+
+    return codes, boundary_ids
+
+
+def get_boundary_candidates(grid, boundary_id):
+    """
+    경계 셀 번호(boundary_id)에 해당하는 후보 법정동코드 배열을 반환합니다.
+    """
+    start, end = grid['boundary_offsets'][boundary_id:boundary_id + 2]
+    return grid['boundary_codes'][start:end]
+
+
+def main():
+    """
+    input 폴더의 shp 파일을 읽어 격자 조회 테이블을 생성하고 리포트를 저장합니다.
+    """
+    # --- 0. 준비 단계 ---
+    TIMESTAMP = datetime.now().strftime('%y%m%d_%H%M')
+
+    shp_list = glob.glob(os.path.join(INPUT_DIR, "*.shp"))
+
+    if not shp_list:
+        print(f"[경고] 'input' 폴더에 .shp 파일이 없습니다: {INPUT_DIR}")
+        return
+
+    print(f"총 {len(shp_list)}개의 SHP 파일을 발견했습니다.")
+    print("==================================================")
+
+    # ==================================================
+    # [1단계] 폴리곤 로드
+    # ==================================================
+    print("[1단계] 법정동 폴리곤 로드...")
+    gdf_list = []
+    for file_path in tqdm(shp_list, desc="폴리곤 로드"):
+        file_name = os.path.basename(file_path)
+        try:
+            gdf = load_bjd_polygons(file_path)
+            if gdf is None:
+                print(f"\n[경고] {file_name}에서 필수 컬럼(코드/명칭)을 찾지 못해 건너뜁니다.")
+                continue
+            gdf_list.append(gdf)
+        except Exception as e:
+            print(f"\n[오류!!] {file_name} 처리 중 예외 발생: {e}")
+            continue
+
+    if not gdf_list:
+        print("처리된 폴리곤이 없어 격자 생성을 건너뜁니다.")
+        return
+
+    polygons = gpd.GeoDataFrame(pd.concat(gdf_list, ignore_index=True), crs=gdf_list[0].crs)
+    n_loaded = len(polygons)
+    polygons = select_finest_layer(polygons)
+    print(f"[정보] 전체 {n_loaded}개 중 하위 리가 있는 읍면동 {n_loaded - len(polygons)}개를 제외했습니다.")
+
+    # ==================================================
+    # [2단계] 격자 생성
+    # ==================================================
+    print(f"\n[2단계] {GRID_CELL_SIZE_M}m 격자 생성 시작... (폴리곤 {len(polygons)}개)")
+    grid_dir = os.path.join(OUTPUT_DIR, f"bjd_{TIMESTAMP}_grid{GRID_CELL_SIZE_M}m")
+    os.makedirs(grid_dir, exist_ok=True)
+
+    started = time.time()
+    stats = build_grid(polygons, GRID_CELL_SIZE_M, grid_dir)
+    elapsed = time.time() - started
+
+    # ==================================================
+    # [3단계] 리포트 저장
+    # ==================================================
+    n_covered = stats['n_single'] + stats['n_boundary']
+    coverage = n_covered / stats['n_cells'] * 100 if stats['n_cells'] else 0.0
+    boundary_ratio = stats['n_boundary'] / n_covered * 100 if n_covered else 0.0
+
+    report_text = (
+        f"격자 크기 {GRID_CELL_SIZE_M}m, 전체 {stats['n_cells']}개 셀 중 "
+        f"{n_covered}개 셀 포함 (커버리지 {coverage:.2f}%), {stats['n_empty']}개 빈 셀\n"
+        f"포함 셀 중 단일 법정동 {stats['n_single']}개, "
+        f"경계 {stats['n_boundary']}개 (경계 비율 {boundary_ratio:.2f}%)\n"
+        f"경계 셀 후보 수 평균 {stats['mean_candidates']:.2f}개, 최대 {stats['max_candidates']}개\n"
+        f"법정동코드 {stats['n_codes']}건 중 {stats['n_codes_boundary_only']}건은 경계 셀로만 조회 가능\n"
+        f"법정동 1개에 완전히 포함되었으나 단일 코드가 아닌 셀 {stats['n_contained_not_single']}개 (0이어야 정상)\n"
+        f"생성 소요 시간 {elapsed:.1f}초"
+    )
+
+    if stats['n_contained_not_single']:
+        print(f"\n[경고] 법정동 내부 셀 {stats['n_contained_not_single']}개가 단일 코드로 기록되지 않았습니다. "
+              f"입력 폴리곤의 중첩 여부를 확인하세요.")
+
+    report_path = os.path.join(grid_dir, 'report.txt')
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write(report_text)
+
+    print(f"\n[완료] 작업 종료.")
+    print(f" - 격자 폴더: {grid_dir}")
+    print(f" - 결과 리포트: {report_path}")
+    print(f" - 내용:\n{report_text}")
+
+
+if __name__ == "__main__":
+    main()